@@ -50,7 +50,7 @@ def load_graph(file_path, filename):
     """Handles both SAS parsing and DIMACS edge lists."""
     if filename.endswith(".sas"):
         try:
-            with open(file_path, "r") as f:
+            with open(file_path, "rb") as f:
                 content = f.read()
             problem = SASParser().parse(content)
             return StateSpaceBuilder(problem).build_reachable_graph()
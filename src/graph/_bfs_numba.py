@@ -0,0 +1,73 @@
+import numpy as np
+from numba import njit, types
+from numba.typed import Dict
+
+
+@njit(cache=True)
+def _grow(arr: np.ndarray) -> np.ndarray:
+    grown = np.empty(arr.shape[0] * 2, dtype=arr.dtype)
+    grown[: arr.shape[0]] = arr
+    return grown
+
+
+@njit(cache=True)
+def bfs(
+    init: int,
+    pre_mask: np.ndarray,
+    pre_val: np.ndarray,
+    eff_mask: np.ndarray,
+    eff_val: np.ndarray,
+):
+    """
+    Compiled BFS over packed int64 states (see SASProblem.pack).
+    Operators are given as parallel mask arrays (SASProblem.operator_masks),
+    so only unconditional effects are supported.
+
+    Returns (states, srcs, dsts, op_ids): states in discovery order (a state's
+    index is its id) and one (src id, dst id, operator index) per transition.
+    """
+    n_ops = pre_mask.shape[0]
+
+    visited = Dict.empty(key_type=types.int64, value_type=types.int64)
+    visited[init] = 0
+
+    # The states array doubles as the BFS queue: everything past `head`
+    # has been discovered but not yet expanded.
+    states = np.empty(1024, dtype=np.int64)
+    states[0] = init
+    n_states = 1
+    head = 0
+
+    srcs = np.empty(1024, dtype=np.int64)
+    dsts = np.empty(1024, dtype=np.int64)
+    op_ids = np.empty(1024, dtype=np.int64)
+    n_edges = 0
+
+    while head < n_states:
+        s = states[head]
+        for k in range(n_ops):
+            if (s & pre_mask[k]) != pre_val[k]:
+                continue
+
+            ns = (s & ~eff_mask[k]) | eff_val[k]
+            v = visited.get(ns, -1)
+            if v == -1:
+                v = n_states
+                visited[ns] = v
+                if n_states == states.shape[0]:
+                    states = _grow(states)
+                states[n_states] = ns
+                n_states += 1
+
+            if n_edges == srcs.shape[0]:
+                srcs = _grow(srcs)
+                dsts = _grow(dsts)
+                op_ids = _grow(op_ids)
+            srcs[n_edges] = head
+            dsts[n_edges] = v
+            op_ids[n_edges] = k
+            n_edges += 1
+
+        head += 1
+
+    return states[:n_states], srcs[:n_edges], dsts[:n_edges], op_ids[:n_edges]
@@ -1,13 +1,29 @@
 import networkx as nx
+import numpy as np
+import math
 import itertools
-from typing import Tuple, Set
+from typing import Dict, Iterator, List, Tuple
+from array import array
 from collections import deque
 from src.parser.models import SASProblem
+from src.graph._bfs_numba import bfs
+
+# Distance reported by multi_source_bfs for nodes a source cannot reach
+UNREACHABLE = np.iinfo(np.int32).max
+
+# (states, srcs, dsts, weights, labels): states indexed by id, plus one entry
+# per transition in the four parallel edge lists.
+Transitions = Tuple[List[Tuple[int, ...]], List[int], List[int], List[int], List[str]]
 
 
 class StateSpaceBuilder:
     def __init__(self, problem: SASProblem):
         self.problem = problem
+        # Node ids of the most recently built graph are small ints; these map
+        # between an id and the state tuple it stands for (also stored as the
+        # node's 'state' attribute).
+        self.state_of: List[Tuple[int, ...]] = []
+        self.id_of: Dict[Tuple[int, ...], int] = {}
 
     def build_reachable_graph(self) -> nx.DiGraph:
         """
@@ -15,33 +31,50 @@ class StateSpaceBuilder:
         Represents the 'Practical' state space (Reachability Analysis).
         Guaranteed to be a single connected component containing the start state.
         """
-        graph = nx.DiGraph()
-        initial_state = self.problem.initial_state
+        # The compiled and batched searches handle unconditional effects only;
+        # anything else goes through the state-at-a-time search.
+        if any(op.has_conditional_effects for op in self.problem.operators):
+            transitions = self._bfs_packed()
+        elif self.problem.packed_bits <= 63:
+            transitions = self._bfs_compiled()
+        else:
+            transitions = self._bfs_frontier()
 
-        # Setup BFS
-        queue = deque([initial_state])
-        visited: Set[Tuple[int, ...]] = {initial_state}
-        graph.add_node(initial_state)
+        return self._emit_graph(*transitions)
 
+    def build_reachable_graph_iter(
+        self,
+    ) -> Iterator[Tuple[Tuple[int, ...], List[Tuple[int, ...]]]]:
+        """
+        Streaming form of build_reachable_graph: yields (state, successors) for
+        each reachable state in BFS order, without building a graph.
+        Successors are distinct and in operator order. Only the visited set
+        (packed ints) and the frontier are held in memory.
+        """
+        problem = self.problem
+        problem.compile_operators()
+        unpack = problem.unpack
+        expanders = [
+            (op.is_applicable_packed, op.apply_packed) for op in problem.operators
+        ]
+
+        initial_state = problem.pack(problem.initial_state)
+        seen = {initial_state}
+        queue = deque([initial_state])
         while queue:
             current_state = queue.popleft()
 
-            for op in self.problem.operators:
-                if not op.is_applicable(current_state):
-                    continue
-
-                next_state = op.apply(current_state)
-
-                # Add Edge (Update weight if a cheaper path is found)
-                self._add_or_update_edge(graph, current_state, next_state, op)
+            successors = {}  # dict keeps the first-seen order of each successor
+            for is_applicable, apply in expanders:
+                if is_applicable(current_state):
+                    successors[apply(current_state)] = None
 
-                # If new state, add to queue
-                if next_state not in visited:
-                    visited.add(next_state)
+            for next_state in successors:
+                if next_state not in seen:
+                    seen.add(next_state)
                     queue.append(next_state)
-                    graph.add_node(next_state)
 
-        return graph
+            yield unpack(current_state), [unpack(s) for s in successors]
 
     def build_cartesian_graph(self, max_states: int = 100000) -> nx.DiGraph:
         """
@@ -49,39 +82,75 @@ class StateSpaceBuilder:
         Represents the 'Theoretical' state space (Cartesian Product).
         Likely contains disconnected islands and unreachable states.
         """
-        graph = nx.DiGraph()
+        problem = self.problem
+        operators = problem.operators
+        sizes = [v.range_size for v in problem.variables]
+
+        # Check the size up front, before anything is materialised
+        total = math.prod(sizes)
+        if total > max_states:
+            raise MemoryError(
+                f"Cartesian graph too large! Would generate {total} states, "
+                f"limit is {max_states}. Stick to Reachable Graph or smaller problems."
+            )
 
-        # 1. Generate all possible states (Cartesian Product of variable ranges)
+        # 1. Every possible state (Cartesian Product of variable ranges), in
+        # row-major order, so state i is the node with id i.
         # e.g., if ranges are [2, 2], creates (0,0), (0,1), (1,0), (1,1)
-        var_ranges = [range(v.range_size) for v in self.problem.variables]
+        states = list(itertools.product(*(range(size) for size in sizes)))
 
-        # Generator to save memory before the check
-        state_generator = itertools.product(*var_ranges)
+        _, _, eff, eff_mask = problem.operator_arrays()
 
-        # We convert to list to check size, but in production with huge spaces
-        # you might want to count differently. For now, this is safe for the limits we set.
-        all_states = list(state_generator)
+        # 2. 'God Mode': For each operator, enumerate exactly the states that
+        # satisfy its preconditions: the constrained variables are fixed and
+        # only the free ones range over their domains. No applicability tests.
+        srcs = [np.empty(0, dtype=np.intp)]
+        dsts = [np.empty(0, dtype=np.intp)]
+        op_ids = [np.empty(0, dtype=np.intp)]
+        for k, op in enumerate(operators):
+            required = dict(op.preconditions)
+            if len(required) != len(set(op.preconditions)):
+                continue  # Contradictory preconditions: never applicable
 
-        if len(all_states) > max_states:
-            raise MemoryError(
-                f"Cartesian graph too large! Generated {len(all_states)} states, "
-                f"limit is {max_states}. Stick to Reachable Graph or smaller problems."
-            )
+            free = [v for v in range(len(sizes)) if v not in required]
+            free_sizes = [sizes[v] for v in free]
+            count = math.prod(free_sizes)
 
-        # 2. Add all nodes first (even the isolated ones)
-        for state in all_states:
-            graph.add_node(state)
+            before = np.empty((count, len(sizes)), dtype=problem.state_dtype)
+            before[:, list(required)] = list(required.values())
+            before[:, free] = np.indices(free_sizes).reshape(len(free), count).T
 
-        # 3. 'God Mode': Check every operator against every state
-        for state in all_states:
-            for op in self.problem.operators:
-                if op.is_applicable(state):
-                    next_state = op.apply(state)
-                    # Note: next_state is guaranteed to be in all_states
-                    # because we generated the full Cartesian product.
-                    self._add_or_update_edge(graph, state, next_state, op)
+            if not op.has_conditional_effects:
+                successors = np.where(eff_mask[k], eff[k], before)
+            else:
+                # Effects apply in order, so a later one on the same
+                # variable overrides an earlier one, as in SASOperator.apply
+                successors = before.copy()
+                for var_id, new_val, conditions in op.effects:
+                    fires = np.ones(count, dtype=bool)
+                    for cond_var, cond_val in conditions:
+                        fires &= before[:, cond_var] == cond_val
+                    successors[fires, var_id] = new_val
 
-        return graph
+            # Note: every state is in the Cartesian product, so its id is
+            # just its row-major index. (atleast_1d: with no variables
+            # ravel_multi_index returns a scalar.)
+            srcs.append(np.atleast_1d(np.ravel_multi_index(before.T, sizes)))
+            dsts.append(np.atleast_1d(np.ravel_multi_index(successors.T, sizes)))
+            op_ids.append(np.full(count, k))
+
+        # Emit edges in state-major order, as a per-state sweep would
+        srcs = np.concatenate(srcs)
+        order = np.argsort(srcs, kind="stable")
+        op_ids = np.concatenate(op_ids)[order].tolist()
+
+        return self._emit_graph(
+            states,
+            srcs[order].tolist(),
+            np.concatenate(dsts)[order].tolist(),
+            [operators[k].cost for k in op_ids],
+            [operators[k].name for k in op_ids],
+        )
 
     def get_main_component(self, graph: nx.DiGraph) -> nx.DiGraph:
         """
@@ -89,31 +158,284 @@ class StateSpaceBuilder:
         Used to filter the messy Cartesian graph down to the relevant 'Island'
         before running Diameter calculations.
         """
-        initial_state = self.problem.initial_state
+        # Look the start up in the graph itself: it need not be the graph this
+        # builder built last, so self.id_of cannot be trusted for it.
+        initial_state = next(
+            (
+                n
+                for n, state in graph.nodes(data="state")
+                if state == self.problem.initial_state
+            ),
+            None,
+        )
 
-        if initial_state not in graph:
+        if initial_state is None:
             raise ValueError("Initial state not found in the provided graph!")
 
-        # Get all weakly connected components (islands)
+        # BFS over the undirected view (successors + predecessors) collects
+        # just the weakly connected component (island) holding the start.
         # We use weak connectivity because the graph is directed.
         # If A->B, they are in the same component.
-        components = nx.weakly_connected_components(graph)
-
-        for component in components:
-            if initial_state in component:
-                # Return the subgraph (view) as a new independent graph
-                return graph.subgraph(component).copy()
-
-        # Should be unreachable code if initial_state is in graph
-        return nx.DiGraph()
-
-    def _add_or_update_edge(
-        self, graph: nx.DiGraph, u: Tuple[int, ...], v: Tuple[int, ...], op
-    ):
-        """Standardized logic to add edges with costs"""
-        if graph.has_edge(u, v):
-            existing_weight = graph[u][v]["weight"]
-            if op.cost < existing_weight:
-                graph.add_edge(u, v, weight=op.cost, label=op.name)
-        else:
-            graph.add_edge(u, v, weight=op.cost, label=op.name)
+        component = {initial_state}
+        order = [initial_state]  # discovery order, so the copy is deterministic
+        queue = deque([initial_state])
+        while queue:
+            u = queue.popleft()
+            for v in itertools.chain(graph.successors(u), graph.predecessors(u)):
+                if v not in component:
+                    component.add(v)
+                    order.append(v)
+                    queue.append(v)
+
+        # Copy the island into a new independent graph in one pass
+        subgraph = nx.DiGraph()
+        subgraph.add_nodes_from((n, graph.nodes[n]) for n in order)
+        subgraph.add_edges_from(
+            (u, v, data)
+            for u, v, data in graph.edges(order, data=True)
+            if v in component
+        )
+        return subgraph
+
+    def multi_source_bfs(
+        self, graph: nx.DiGraph, sources: List[Tuple[int, ...]]
+    ) -> np.ndarray:
+        """
+        Unit-cost BFS from several states of `graph` at once. Returns an
+        (S, N) int32 matrix where dist[i, j] is the number of steps from
+        sources[i] to the j-th node of `graph` (in graph.nodes order, which is
+        the node id for graphs built here), or UNREACHABLE.
+
+        All S searches advance one layer at a time together, so each layer
+        is a handful of array operations over every source's frontier.
+        """
+        index = {node: j for j, node in enumerate(graph)}
+        node_of = {state: index[node] for node, state in graph.nodes(data="state")}
+        missing = [s for s in sources if s not in node_of]
+        if missing:
+            raise ValueError(f"Source states not found in the graph: {missing}")
+
+        # CSR adjacency: the successors of node u are indices[indptr[u]:indptr[u + 1]]
+        n = len(index)
+        edges = np.fromiter(
+            (index[x] for edge in graph.edges for x in edge),
+            dtype=np.int64,
+            count=2 * graph.number_of_edges(),
+        ).reshape(-1, 2)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(edges[:, 0], minlength=n), out=indptr[1:])
+        indices = edges[np.argsort(edges[:, 0], kind="stable"), 1]
+
+        rows = np.arange(len(sources))
+        nodes = np.array([node_of[s] for s in sources], dtype=np.int64)
+
+        dist = np.full((len(sources), n), UNREACHABLE, dtype=np.int32)
+        dist[rows, nodes] = 0
+
+        depth = 0
+        while len(nodes):
+            depth += 1
+
+            # Gather every out-edge of every (source, frontier node) pair
+            starts = indptr[nodes]
+            counts = indptr[nodes + 1] - starts
+            total = counts.sum()
+            if not total:
+                break
+            offsets = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+            nbrs = indices[offsets + np.arange(total)]
+            owners = np.repeat(rows, counts)
+
+            # Keep the first visit of each (source, node) pair
+            new = dist[owners, nbrs] == UNREACHABLE
+            owners, nbrs = owners[new], nbrs[new]
+            dist[owners, nbrs] = depth
+
+            # A node reached twice in the same layer is expanded once
+            pairs = np.unique(owners * n + nbrs)
+            rows, nodes = np.divmod(pairs, n)
+
+        return dist
+
+    def _bfs_compiled(self) -> Transitions:
+        """
+        Runs the Numba BFS over int64-packed states.
+        Requires packed_bits <= 63 and no conditional effects.
+        """
+        problem = self.problem
+        operators = problem.operators
+        initial_state = problem.pack(problem.initial_state)
+
+        packed, srcs, dsts, op_ids = bfs(initial_state, *problem.operator_masks())
+
+        states = [tuple(row) for row in problem.unpack_array(packed).tolist()]
+        op_ids = op_ids.tolist()
+        weights = [operators[k].cost for k in op_ids]
+        labels = [operators[k].name for k in op_ids]
+        return states, srcs.tolist(), dsts.tolist(), weights, labels
+
+    def _bfs_frontier(self) -> Transitions:
+        """
+        Layer-by-layer BFS where each frontier is an (F, V) NumPy matrix.
+        Every operator is tested against the whole frontier at once; only the
+        visited-set lookups remain per state, keyed by the raw row bytes.
+        """
+        problem = self.problem
+        operators = problem.operators
+        pre_idx, pre_val, eff, eff_mask = problem.operator_arrays()
+        n_vars = len(problem.variables)
+        dtype = problem.state_dtype
+        # Lets a whole matrix be read back as one bytes object per row
+        row_dtype = np.dtype((np.void, n_vars * dtype.itemsize))
+
+        frontier = np.array([problem.initial_state], dtype=dtype).reshape(1, n_vars)
+        state_id: Dict[bytes, int] = {frontier.view(row_dtype)[0, 0].tobytes(): 0}
+        layers = [frontier]
+        srcs: List[int] = []
+        dsts: List[int] = []
+        op_ids: List[int] = []
+
+        # Ids are handed out in discovery order, so the frontier always holds
+        # the states numbered [base, base + len(frontier)).
+        base = 0
+        while len(frontier):
+            cand_src = []
+            cand_op = []
+            cand_states = []
+            for k in range(len(operators)):
+                mask = (frontier[:, pre_idx[k]] == pre_val[k]).all(axis=1)
+                src_rows = np.flatnonzero(mask)
+                if not len(src_rows):
+                    continue
+
+                successors = np.where(eff_mask[k], eff[k], frontier[src_rows])
+
+                cand_src.append(src_rows)
+                cand_op.append(np.full(len(src_rows), k))
+                cand_states.append(successors)
+
+            if not cand_src:
+                break
+
+            # Restore the state-major order of a plain BFS so that state ids
+            # and edge order match the state-at-a-time search.
+            src_all = np.concatenate(cand_src)
+            order = np.argsort(src_all, kind="stable")
+            successors = np.concatenate(cand_states)[order]
+
+            new_rows = []
+            keys = successors.view(row_dtype).ravel().tolist()
+            for i, key in enumerate(keys):
+                new_id = len(state_id)
+                v = state_id.setdefault(key, new_id)
+                if v == new_id:
+                    new_rows.append(i)
+                dsts.append(v)
+
+            srcs.extend((src_all[order] + base).tolist())
+            op_ids.extend(np.concatenate(cand_op)[order].tolist())
+
+            base += len(frontier)
+            frontier = successors[new_rows]
+            layers.append(frontier)
+
+        states = [tuple(row) for row in np.concatenate(layers).tolist()]
+        weights = [operators[k].cost for k in op_ids]
+        labels = [operators[k].name for k in op_ids]
+        return states, srcs, dsts, weights, labels
+
+    def _bfs_packed(self) -> Transitions:
+        """
+        State-at-a-time BFS over packed states (see SASProblem.pack).
+        Handles conditional effects, which the batched search does not.
+        """
+        problem = self.problem
+        problem.compile_operators()
+        initial_state = problem.pack(problem.initial_state)
+
+        # States are numbered in discovery order and transitions are recorded
+        # as flat parallel lists; states are only unpacked at the end.
+        state_id: Dict[int, int] = {initial_state: 0}
+        srcs: List[int] = []
+        dsts: List[int] = []
+        weights: List[int] = []
+        labels: List[str] = []
+
+        # Setup BFS. The queue holds every discovered state in id order and
+        # is never popped from: `head` is the id of the next state to expand.
+        # When states fit in 63 bits it is a typed int64 array, so the
+        # entries are stored unboxed.
+        queue = array("q") if problem.packed_bits <= 63 else []
+        queue.append(initial_state)
+        head = 0
+
+        # Hot loop: bind everything it touches to locals up front, including
+        # each operator's methods and attributes.
+        expanders = [
+            (op.is_applicable_packed, op.apply_packed, op.cost, op.name)
+            for op in problem.operators
+        ]
+        enqueue = queue.append
+        setdefault = state_id.setdefault
+        add_src = srcs.append
+        add_dst = dsts.append
+        add_weight = weights.append
+        add_label = labels.append
+
+        while head < len(queue):
+            current_state = queue[head]
+            u = head
+            head += 1
+
+            for is_applicable, apply, cost, name in expanders:
+                if not is_applicable(current_state):
+                    continue
+
+                next_state = apply(current_state)
+
+                # If new state, it receives the next free id and joins the queue
+                new_id = len(state_id)
+                v = setdefault(next_state, new_id)
+                if v == new_id:
+                    enqueue(next_state)
+
+                add_src(u)
+                add_dst(v)
+                add_weight(cost)
+                add_label(name)
+
+        states = [problem.unpack(packed) for packed in queue]
+        return states, srcs, dsts, weights, labels
+
+    def _emit_graph(
+        self,
+        states: List[Tuple[int, ...]],
+        srcs: List[int],
+        dsts: List[int],
+        weights: List[int],
+        labels: List[str],
+    ) -> nx.DiGraph:
+        """
+        Builds the final DiGraph from flat edge lists over state ids.
+        Node i carries states[i] as its 'state' attribute.
+        Parallel transitions between the same pair of states are collapsed,
+        keeping the cheapest one (the first seen wins on ties).
+        """
+        self.state_of = states
+        self.id_of = {state: i for i, state in enumerate(states)}
+
+        best: Dict[int, int] = {}
+        best_get = best.get
+        for i, (u, v) in enumerate(zip(srcs, dsts)):
+            key = (u << 32) | v
+            j = best_get(key)
+            if j is None or weights[i] < weights[j]:
+                best[key] = i
+
+        graph = nx.DiGraph()
+        graph.add_nodes_from((i, {"state": state}) for i, state in enumerate(states))
+        graph.add_edges_from(
+            (srcs[i], dsts[i], {"weight": weights[i], "label": labels[i]})
+            for i in best.values()
+        )
+        return graph
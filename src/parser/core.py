@@ -1,14 +1,22 @@
-from typing import List, Iterator, Tuple
+from typing import List, Tuple, Union
 from .models import SASProblem, SASVariable, SASOperator
 
 
 class SASParser:
     def __init__(self):
-        self.lines: Iterator[str] = iter([])
-
-    def parse(self, content: str) -> SASProblem:
-        """Main entry point: Converts raw SAS string to SASProblem AST."""
-        self.lines = iter(content.strip().splitlines())
+        self.lines: List[str] = []
+        self.i = 0  # index of the next unread line
+
+    def parse(self, content: Union[str, bytes, memoryview]) -> SASProblem:
+        """
+        Main entry point: Converts raw SAS string to SASProblem AST.
+        Also accepts any bytes-like buffer (bytes, memoryview, mmap), decoded
+        in one pass, so files can be read in binary mode.
+        """
+        if not isinstance(content, str):
+            content = str(content, "utf-8")
+        self.lines = content.strip().splitlines()
+        self.i = 0
 
         # Placeholders
         version = 3
@@ -18,47 +26,53 @@ class SASParser:
         goal = tuple()
         operators = []
 
-        while True:
-            try:
-                line = next(self.lines).strip()
-                if line == "begin_version":
-                    version = int(next(self.lines))
-                elif line == "begin_metric":
-                    metric = bool(int(next(self.lines)))
-                elif line == "begin_variable":
-                    variables.append(self._parse_variable(len(variables)))
-                elif line == "begin_state":
-                    initial_state = self._parse_state(len(variables))
-                elif line == "begin_goal":
-                    goal = self._parse_goal()
-                elif line == "begin_operator":
-                    operators.append(self._parse_operator())
-            except StopIteration:
-                break
+        while self.i < len(self.lines):
+            line = self._next().strip()
+            if line == "begin_version":
+                version = int(self._next())
+            elif line == "begin_metric":
+                metric = bool(int(self._next()))
+            elif line == "begin_variable":
+                variables.append(self._parse_variable(len(variables)))
+            elif line == "begin_state":
+                initial_state = self._parse_state(len(variables))
+            elif line == "begin_goal":
+                goal = self._parse_goal()
+            elif line == "begin_operator":
+                operators.append(self._parse_operator())
 
         return SASProblem(version, metric, variables, initial_state, goal, operators)
 
+    def _next(self) -> str:
+        if self.i >= len(self.lines):
+            raise ValueError("Unexpected end of SAS file")
+        self.i += 1
+        return self.lines[self.i - 1]
+
+    def _take(self, count: int) -> List[str]:
+        """Returns the next `count` lines as a block."""
+        if self.i + count > len(self.lines):
+            raise ValueError("Unexpected end of SAS file")
+        block = self.lines[self.i : self.i + count]
+        self.i += count
+        return block
+
     def _parse_variable(self, var_id: int) -> SASVariable:
-        name = next(self.lines).strip()
-        next(self.lines)  # Ignore layer
-        range_size = int(next(self.lines))
-        atom_names = []
-        for _ in range(range_size):
-            atom_names.append(next(self.lines).strip())
-
-        check = next(self.lines).strip()
+        name = self._next().strip()
+        self._next()  # Ignore layer
+        range_size = int(self._next())
+        atom_names = [line.strip() for line in self._take(range_size)]
+
+        check = self._next().strip()
         if check != "end_variable":
             raise ValueError(f"Expected 'end_variable' but found '{check}'")
 
         return SASVariable(name, var_id, range_size, atom_names)
 
     def _parse_state(self, variable_count: int) -> Tuple[int, ...]:
-        state = []
-        for _ in range(variable_count):
-            val = next(self.lines).strip()
-            state.append(int(val))
+        state = [int(val) for val in self._take(variable_count)]
 
-        check_tag = next(self.lines).strip()
+        check_tag = self._next().strip()
         if check_tag != "end_state":
             raise ValueError(
                 f"Error parsing state: Expected 'end_state' but found '{check_tag}'"
@@ -67,55 +81,82 @@ class SASParser:
         return tuple(state)
 
     def _parse_goal(self) -> Tuple[Tuple[int, int], ...]:
-        count = int(next(self.lines))
+        count = int(self._next())
         goals = []
-        for _ in range(count):
-            line = next(self.lines).split()
+        for raw in self._take(count):
+            line = raw.split()
             goals.append((int(line[0]), int(line[1])))
 
-        check = next(self.lines).strip()
+        check = self._next().strip()
         if check != "end_goal":
             raise ValueError(f"Expected 'end_goal' but found '{check}'")
 
         return tuple(goals)
 
     def _parse_operator(self) -> SASOperator:
-        name = next(self.lines).strip()
+        # Hot loop: index the line list directly rather than through
+        # _next/_take. A short block pushes i past the end, so the final
+        # cost/end_operator lookup raises IndexError on truncated input.
+        lines = self.lines
+        i = self.i
+        try:
+            name = lines[i].strip()
+
+            # 1. Explicit Preconditions (Prevail conditions)
+            prevail_count = int(lines[i + 1])
+            i += 2
+            prevail = lines[i : i + prevail_count]
+            i += prevail_count
+
+            # 2. Effects
+            effect_count = int(lines[i])
+            i += 1
+            effect_lines = lines[i : i + effect_count]
+            i += effect_count
+
+            cost = int(lines[i])
+            check = lines[i + 1].strip()
+        except IndexError:
+            raise ValueError("Unexpected end of SAS file") from None
+        self.i = i + 2
 
-        # 1. Explicit Preconditions (Prevail conditions)
-        prevail_count = int(next(self.lines))
         preconditions = []
-        for _ in range(prevail_count):
-            line = next(self.lines).split()
+        for raw in prevail:
+            line = raw.split()
             preconditions.append((int(line[0]), int(line[1])))
 
-        # 2. Effects
-        effect_count = int(next(self.lines))
         effects = []
-        for _ in range(effect_count):
-            line = next(self.lines).split()
-
-            # [0] is the count of conditions for this specific effect
-            cond_count = int(line[0])
-            effect_conditions = []
-
-            # Loop through the condition pairs (if any)
-            # Conditions start at index 1. Each condition is 2 numbers (var, val).
-            for i in range(cond_count):
-                c_var_idx = 1 + (2 * i)
-                c_val_idx = c_var_idx + 1
-
-                c_var = int(line[c_var_idx])
-                c_val = int(line[c_val_idx])
-                effect_conditions.append((c_var, c_val))
-
-            # The standard effect triplet is always at the end
-            # Calculate the start index exactly as we discussed
-            base_idx = 1 + (2 * cond_count)
-
-            var_id = int(line[base_idx])
-            pre_val = int(line[base_idx + 1])
-            post_val = int(line[base_idx + 2])
+        for raw in effect_lines:
+            line = raw.split()
+
+            if line[0] == "0":
+                # Fast path: the vast majority of effects are unconditional,
+                # i.e. just "0 var pre post"
+                effect_conditions = []
+                var_id = int(line[1])
+                pre_val = int(line[2])
+                post_val = int(line[3])
+            else:
+                # [0] is the count of conditions for this specific effect
+                cond_count = int(line[0])
+                effect_conditions = []
+
+                # Loop through the condition pairs.
+                # Conditions start at index 1. Each condition is 2 numbers (var, val).
+                for i in range(cond_count):
+                    c_var_idx = 1 + (2 * i)
+                    c_val_idx = c_var_idx + 1
+
+                    c_var = int(line[c_var_idx])
+                    c_val = int(line[c_val_idx])
+                    effect_conditions.append((c_var, c_val))
+
+                # The standard effect triplet is always at the end
+                base_idx = 1 + (2 * cond_count)
+
+                var_id = int(line[base_idx])
+                pre_val = int(line[base_idx + 1])
+                post_val = int(line[base_idx + 2])
 
             # Logic: If pre_val is not -1, it applies to the whole operator
             if pre_val != -1:
@@ -123,9 +164,6 @@ class SASParser:
 
             effects.append((var_id, post_val, effect_conditions))
 
-        cost = int(next(self.lines))
-
-        check = next(self.lines).strip()
         if check != "end_operator":
             raise ValueError(
                 f"Expected 'end_operator' but found '{check}'. Check your effect parsing logic!"
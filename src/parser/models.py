@@ -1,5 +1,29 @@
+import itertools
+import numpy as np
 from dataclasses import dataclass, field
-from typing import List, Tuple
+from functools import cached_property
+from operator import itemgetter
+from typing import Callable, FrozenSet, List, Tuple, Union
+from pathlib import Path
+
+
+def _no_preconditions(state: Tuple[int, ...]) -> Tuple[int, ...]:
+    return ()
+
+
+def _contradicts(pairs: List[Tuple[int, int]]) -> bool:
+    """True if some variable is required to hold two different values."""
+    return len(dict(pairs)) != len(set(pairs))
+
+
+def _pack_strings(strings: List[str]) -> np.ndarray:
+    # Newline-terminated UTF-8 bytes: far cheaper to load than a fixed-width
+    # unicode array. SAS names are whole lines, so never contain newlines.
+    return np.frombuffer("".join(f"{s}\n" for s in strings).encode(), np.uint8)
+
+
+def _unpack_strings(data: np.ndarray) -> List[str]:
+    return data.tobytes().decode().split("\n")[:-1]
 
 
 @dataclass
@@ -17,15 +41,75 @@ class SASOperator:
     preconditions: List[Tuple[int, int]]  # (var_id, val)
     effects: List[Tuple[int, int, List[Tuple[int, int]]]]  # (var_id, val, conditions)
 
+    # Bitmask form of the operator over packed states (see SASProblem.pack).
+    # Filled in by SASProblem.compile_operators; None until then, so the
+    # packed methods refuse to run on an uncompiled operator.
+    _pre_mask: int = field(default=None, init=False, repr=False, compare=False)
+    _pre_value: int = field(default=None, init=False, repr=False, compare=False)
+    _eff_mask: int = field(default=None, init=False, repr=False, compare=False)
+    _eff_value: int = field(default=None, init=False, repr=False, compare=False)
+    # (cond_mask, cond_value, eff_mask, eff_value) for each conditional effect
+    _cond_effects: List[Tuple[int, int, int, int]] = field(
+        default_factory=list, init=False, repr=False, compare=False
+    )
+
+    # is_applicable fetches all constrained variables with one itemgetter
+    # call and compares them against the required values in one go. Built on
+    # the first call (None until then), so parsing does not pay for it.
+    _pre_get: Callable = field(default=None, init=False, repr=False, compare=False)
+    _pre_values: tuple = field(default=(), init=False, repr=False, compare=False)
+    # (var_id, val) pairs for apply when no effect has conditions, () when
+    # some effect has. Built on the first apply call (None until then).
+    _eff_tuple: tuple = field(default=None, init=False, repr=False, compare=False)
+
+    # Unordered views for membership checks; the lists keep file order.
+    # Computed on first access, so parsing does not pay for them.
+    @cached_property
+    def preconditions_set(self) -> FrozenSet[Tuple[int, int]]:
+        return frozenset(self.preconditions)
+
+    @cached_property
+    def effects_pairs_set(self) -> FrozenSet[Tuple[int, int]]:
+        return frozenset((var_id, val) for var_id, val, _ in self.effects)
+
+    # Dataclass equality compares the fields; hash their order-free content
+    # so equal operators hash equally (the lists themselves are unhashable).
+    def __hash__(self):
+        return hash(
+            (self.name, self.cost, self.preconditions_set, self.effects_pairs_set)
+        )
+
+    @property
+    def has_conditional_effects(self) -> bool:
+        return any(conditions for _, _, conditions in self.effects)
+
     def is_applicable(self, state: Tuple[int, ...]) -> bool:
         """Checks if this operator can be applied to the given state."""
-        for var_id, val in self.preconditions:
-            if state[var_id] != val:
-                return False
-        return True
+        if self._pre_get is None:
+            self._compile_preconditions()
+        return self._pre_get(state) == self._pre_values
+
+    def _compile_preconditions(self) -> None:
+        if self.preconditions:
+            var_ids, values = zip(*self.preconditions)
+            self._pre_get = itemgetter(*var_ids)
+            # itemgetter returns a bare value rather than a 1-tuple for one key
+            self._pre_values = values if len(values) > 1 else values[0]
+        else:
+            self._pre_get = _no_preconditions
 
     def apply(self, state: Tuple[int, ...]) -> Tuple[int, ...]:
         """Returns a NEW state resulting from applying this operator."""
+        if self._eff_tuple is None:
+            # First call. Most SAS+ operators have no conditional effects; those
+            # rebind apply to a version that skips the per-effect condition scan.
+            if self.has_conditional_effects:
+                self._eff_tuple = ()
+            else:
+                self._eff_tuple = tuple((v, val) for v, val, _ in self.effects)
+                self.apply = self._apply_unconditional
+                return self.apply(state)
+
         new_state = list(state)  # Create a mutable copy
 
         for var_id, new_val, conditions in self.effects:
@@ -43,6 +127,70 @@ class SASOperator:
 
         return tuple(new_state)
 
+    def _apply_unconditional(self, state: Tuple[int, ...]) -> Tuple[int, ...]:
+        """apply, specialised for operators without conditional effects."""
+        new_state = list(state)
+        for var_id, new_val in self._eff_tuple:
+            new_state[var_id] = new_val
+        return tuple(new_state)
+
+    def compile_masks(self, shifts: List[int], masks: List[int]) -> None:
+        """Precomputes the bitmasks used by the packed-state methods."""
+        self._pre_mask = 0
+        self._pre_value = 0
+        if _contradicts(self.preconditions):
+            # A variable is required to hold two values: never applicable
+            # (packed & 0 is always 0, never 1)
+            self._pre_value = 1
+        else:
+            for var_id, val in self.preconditions:
+                self._pre_mask |= masks[var_id] << shifts[var_id]
+                self._pre_value |= val << shifts[var_id]
+
+        # Effects apply in file order, so the last one to fire wins. An
+        # unconditional effect is folded into _eff_mask/_eff_value (applied
+        # first) unless an earlier conditional effect writes the same variable;
+        # then it stays in the ordered _cond_effects list with cond_mask = 0.
+        self._eff_mask = 0
+        self._eff_value = 0
+        self._cond_effects = []
+        cond_written = 0  # bits written by conditional effects so far
+        for var_id, new_val, conditions in self.effects:
+            eff_mask = masks[var_id] << shifts[var_id]
+            eff_value = new_val << shifts[var_id]
+            if not conditions and not cond_written & eff_mask:
+                self._eff_mask |= eff_mask
+                self._eff_value = (self._eff_value & ~eff_mask) | eff_value
+                continue
+
+            if _contradicts(conditions):
+                continue  # Can never fire, like in apply
+
+            cond_mask = 0
+            cond_value = 0
+            for cond_var, cond_val in conditions:
+                cond_mask |= masks[cond_var] << shifts[cond_var]
+                cond_value |= cond_val << shifts[cond_var]
+            self._cond_effects.append((cond_mask, cond_value, eff_mask, eff_value))
+            cond_written |= eff_mask
+
+    def is_applicable_packed(self, packed: int) -> bool:
+        """Same as is_applicable, for a state packed with SASProblem.pack."""
+        assert self._pre_mask is not None, "Operator masks not compiled"
+        return (packed & self._pre_mask) == self._pre_value
+
+    def apply_packed(self, packed: int) -> int:
+        """Same as apply, for a state packed with SASProblem.pack."""
+        assert self._eff_mask is not None, "Operator masks not compiled"
+        new_packed = (packed & ~self._eff_mask) | self._eff_value
+
+        # Effect conditions are checked against the state before the operator
+        for cond_mask, cond_value, eff_mask, eff_value in self._cond_effects:
+            if (packed & cond_mask) == cond_value:
+                new_packed = (new_packed & ~eff_mask) | eff_value
+
+        return new_packed
+
 
 @dataclass
 class SASProblem:
@@ -54,3 +202,208 @@ class SASProblem:
     goal: Tuple[Tuple[int, int], ...]
     operators: List[SASOperator]
     mutex_groups: List = field(default_factory=list)
+
+    # Bit layout of a packed state: variable i lives at bit offset _shifts[i]
+    # and spans just enough bits (_masks[i]) to hold values < range_size.
+    _shifts: List[int] = field(
+        default_factory=list, init=False, repr=False, compare=False
+    )
+    _masks: List[int] = field(
+        default_factory=list, init=False, repr=False, compare=False
+    )
+    # Total width of a packed state in bits
+    packed_bits: int = field(default=0, init=False, repr=False, compare=False)
+
+    # Smallest integer dtype able to hold every variable value, used when
+    # states are stored as rows of a NumPy matrix.
+    state_dtype: np.dtype = field(default=None, init=False, repr=False, compare=False)
+    # Set once compile_operators has filled in every operator's bitmasks
+    _operators_compiled: bool = field(
+        default=False, init=False, repr=False, compare=False
+    )
+    # Cached result of operator_arrays; only the batched searches need it
+    _op_arrays: tuple = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        max_range = max((var.range_size for var in self.variables), default=1)
+        self.state_dtype = np.min_scalar_type(max(max_range - 1, 0))
+
+        offset = 0
+        for var in self.variables:
+            width = max(1, (var.range_size - 1).bit_length())
+            self._shifts.append(offset)
+            self._masks.append((1 << width) - 1)
+            offset += width
+        self.packed_bits = offset
+
+    def __hash__(self):
+        return hash(
+            (
+                self.version,
+                self.metric,
+                self.initial_state,
+                self.goal,
+                tuple(self.operators),
+            )
+        )
+
+    def pack(self, state: Tuple[int, ...]) -> int:
+        """Encodes a state tuple as a single int (one bitfield per variable)."""
+        packed = 0
+        for val, shift in zip(state, self._shifts):
+            packed |= val << shift
+        return packed
+
+    def unpack(self, packed: int) -> Tuple[int, ...]:
+        """Inverse of pack."""
+        return tuple(
+            (packed >> shift) & mask for shift, mask in zip(self._shifts, self._masks)
+        )
+
+    def unpack_array(self, packed: np.ndarray) -> np.ndarray:
+        """Vectorised unpack: an array of N packed states to an (N, V) matrix."""
+        shifts = np.array(self._shifts, dtype=np.int64)
+        masks = np.array(self._masks, dtype=np.int64)
+        return (packed[:, None] >> shifts) & masks
+
+    def compile_operators(self) -> None:
+        """
+        Compiles the packed-state bitmasks of every operator (see
+        SASOperator.compile_masks). Only the packed searches need them, so
+        this runs on first use rather than at parse time; later calls are free.
+        """
+        if not self._operators_compiled:
+            for op in self.operators:
+                op.compile_masks(self._shifts, self._masks)
+            self._operators_compiled = True
+
+    def operator_masks(self) -> Tuple[np.ndarray, ...]:
+        """
+        Returns (pre_mask, pre_value, eff_mask, eff_value) as int64 arrays with
+        one entry per operator. Only valid when packed_bits <= 63 and no
+        operator has conditional effects.
+        """
+        self.compile_operators()
+        return tuple(
+            np.array([getattr(op, attr) for op in self.operators], dtype=np.int64)
+            for attr in ("_pre_mask", "_pre_value", "_eff_mask", "_eff_value")
+        )
+
+    def operator_arrays(
+        self,
+    ) -> Tuple[List[np.ndarray], List[np.ndarray], np.ndarray, np.ndarray]:
+        """
+        Array form of the operators for batched expansion over (states x vars)
+        matrices: (pre_idx, pre_val, eff, eff_mask). pre_idx[k]/pre_val[k] hold
+        operator k's precondition variables and values. eff/eff_mask are
+        (operators x vars): where eff_mask[k] is set, operator k's successor
+        takes the value in eff[k]. Only unconditional effects are included.
+        Built on first use and cached, so plain parsing never pays for it.
+        """
+        if self._op_arrays is None:
+            dtype = self.state_dtype
+            shape = (len(self.operators), len(self.variables))
+            pre_idx = []
+            pre_val = []
+            eff = np.zeros(shape, dtype=dtype)
+            eff_mask = np.zeros(shape, dtype=bool)
+            for k, op in enumerate(self.operators):
+                pre_idx.append(np.array([v for v, _ in op.preconditions], np.int32))
+                pre_val.append(np.array([val for _, val in op.preconditions], dtype))
+                for var_id, new_val, conditions in op.effects:
+                    if not conditions:
+                        eff[k, var_id] = new_val
+                        eff_mask[k, var_id] = True
+            self._op_arrays = (pre_idx, pre_val, eff, eff_mask)
+        return self._op_arrays
+
+    def save_npz(self, path: Union[str, Path]) -> None:
+        """
+        Writes the problem to an .npz archive of flat integer and string arrays
+        (no pickles), readable with load_npz. Ragged per-variable and
+        per-operator lists are stored flattened, alongside their lengths.
+        """
+        effects = [eff for op in self.operators for eff in op.effects]
+        # Through a file handle, so np.savez writes to `path` exactly instead
+        # of appending ".npz" (load_npz then reads the same path back)
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                header=np.array([self.version, int(self.metric)]),
+                var_names=_pack_strings([var.name for var in self.variables]),
+                var_ranges=np.array([var.range_size for var in self.variables]),
+                atom_names=_pack_strings(
+                    [atom for var in self.variables for atom in var.atom_names]
+                ),
+                initial_state=np.array(self.initial_state, dtype=np.int64),
+                goal=np.array(self.goal, dtype=np.int64).reshape(-1, 2),
+                op_names=_pack_strings([op.name for op in self.operators]),
+                op_costs=np.array([op.cost for op in self.operators]),
+                op_pre_counts=np.array(
+                    [len(op.preconditions) for op in self.operators]
+                ),
+                op_eff_counts=np.array([len(op.effects) for op in self.operators]),
+                preconditions=np.array(
+                    [pre for op in self.operators for pre in op.preconditions],
+                    dtype=np.int64,
+                ).reshape(-1, 2),
+                # (var_id, val, number of conditions) per effect
+                effects=np.array(
+                    [(var_id, val, len(conds)) for var_id, val, conds in effects],
+                    dtype=np.int64,
+                ).reshape(-1, 3),
+                conditions=np.array(
+                    [cond for _, _, conds in effects for cond in conds], dtype=np.int64
+                ).reshape(-1, 2),
+            )
+
+    @classmethod
+    def load_npz(cls, path: Union[str, Path]) -> "SASProblem":
+        """Inverse of save_npz."""
+        with np.load(path, allow_pickle=False) as data:
+            version, metric = data["header"].tolist()
+            var_names = _unpack_strings(data["var_names"])
+            var_ranges = data["var_ranges"].tolist()
+            atom_names = _unpack_strings(data["atom_names"])
+            initial_state = tuple(data["initial_state"].tolist())
+            goal = tuple(map(tuple, data["goal"].tolist()))
+            op_names = _unpack_strings(data["op_names"])
+            op_costs = data["op_costs"].tolist()
+            pre_counts = data["op_pre_counts"].tolist()
+            eff_counts = data["op_eff_counts"].tolist()
+            preconditions = list(map(tuple, data["preconditions"].tolist()))
+            effect_rows = data["effects"].tolist()
+            conditions = list(map(tuple, data["conditions"].tolist()))
+
+        # Regroup the flat lists by slicing at running offsets
+        variables = []
+        for var_id, (name, size, end) in enumerate(
+            zip(var_names, var_ranges, itertools.accumulate(var_ranges))
+        ):
+            variables.append(
+                SASVariable(name, var_id, size, atom_names[end - size : end])
+            )
+
+        effects = []
+        offset = 0
+        for var_id, val, cond_count in effect_rows:
+            effects.append((var_id, val, conditions[offset : offset + cond_count]))
+            offset += cond_count
+
+        operators = []
+        pre_offset = eff_offset = 0
+        for name, cost, pre_count, eff_count in zip(
+            op_names, op_costs, pre_counts, eff_counts
+        ):
+            operators.append(
+                SASOperator(
+                    name,
+                    cost,
+                    preconditions[pre_offset : pre_offset + pre_count],
+                    effects[eff_offset : eff_offset + eff_count],
+                )
+            )
+            pre_offset += pre_count
+            eff_offset += eff_count
+
+        return cls(version, bool(metric), variables, initial_state, goal, operators)
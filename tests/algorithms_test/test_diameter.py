@@ -1,17 +1,16 @@
 import unittest
 import networkx as nx
-from src.parser.core import SASParser
 from src.graph.builder import StateSpaceBuilder
 from src.algorithms.diameter import DiameterCalculator
-from tests.config import get_data_file
+from tests.config import get_data_file, load_problem
 
 
 class TestGripperDiameter(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.problem = load_problem(get_data_file("gripper_simple.sas"))
+
     def setUp(self):
-        file_path = get_data_file("gripper_simple.sas")
-        with open(file_path, "r") as f:
-            content = f.read()
-        self.problem = SASParser().parse(content)
         self.builder = StateSpaceBuilder(self.problem)
         self.graph = self.builder.build_reachable_graph()
         self.calc = DiameterCalculator(self.graph)
@@ -42,11 +41,11 @@ class TestGripperDiameter(unittest.TestCase):
 
 
 class TestSwitchDiameter(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.problem = load_problem(get_data_file("switch_simple.sas"))
+
     def setUp(self):
-        file_path = get_data_file("switch_simple.sas")
-        with open(file_path, "r") as f:
-            content = f.read()
-        self.problem = SASParser().parse(content)
         self.builder = StateSpaceBuilder(self.problem)
         self.graph = self.builder.build_cartesian_graph()
         self.calc = DiameterCalculator(self.graph)
@@ -1,9 +1,79 @@
+"""
+Shared test helpers. Problems returned by load_problem are cached per process
+(and pickled under CACHE_DIR), so every caller gets the same SASProblem instance:
+treat it as read-only and never mutate it in a test.
+"""
+
+import functools
+import hashlib
+import mmap
+import os
+import pickle
 from pathlib import Path
 
+import src.parser.core
+import src.parser.models
+from src.parser.core import SASParser
+from src.parser.models import SASProblem
+
 TESTS_ROOT = Path(__file__).parent
 PROJECT_ROOT = TESTS_ROOT.parent
 DATA_DIR = PROJECT_ROOT / "data"
+# Parsed fixtures pickled by load_problem (git-ignored)
+CACHE_DIR = PROJECT_ROOT / ".pytest_cache" / "sas"
+
+# One parser for the whole test session; parse() resets its state per call
+PARSER = SASParser()
 
 
+@functools.lru_cache(maxsize=None)
 def get_data_file(filename: str) -> Path:
     return DATA_DIR / filename
+
+
+def get_data_bytes(filename: str) -> mmap.mmap:
+    """Read-only memory map of a fixture; SASParser.parse accepts it directly."""
+    with open(get_data_file(filename), "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+@functools.lru_cache(maxsize=None)
+def load_problem(path: Path) -> SASProblem:
+    """
+    Parses a SAS file, caching the result as a pickle under CACHE_DIR.
+    The cache key covers the file and the parser sources, so editing either
+    one invalidates old pickles; those are deleted when the new one is written.
+    """
+    path = Path(path)
+    content = path.read_bytes()
+    digest = hashlib.sha1(content)
+    for module in (src.parser.core, src.parser.models):
+        digest.update(Path(module.__file__).read_bytes())
+
+    # One cache entry per fixture path: <name>-<path hash>.<content key>.pkl
+    path_key = hashlib.sha1(str(path.absolute()).encode()).hexdigest()[:8]
+    stem = f"{path.name}-{path_key}"
+    cache_path = CACHE_DIR / f"{stem}.{digest.hexdigest()[:16]}.pkl"
+
+    try:
+        with open(cache_path, "rb") as f:
+            return pickle.load(f)
+    except Exception:
+        pass  # Missing, truncated or unloadable here (e.g. NumPy upgrade): reparse
+
+    problem = PARSER.parse(content)
+    # Write then rename, so parallel workers never read a half-written pickle
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            pickle.dump(problem, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except Exception:
+        tmp_path.unlink(missing_ok=True)
+        return problem  # Caching is best effort
+
+    for stale in CACHE_DIR.glob(f"{stem}.*.pkl"):
+        if stale != cache_path:
+            stale.unlink(missing_ok=True)
+    return problem
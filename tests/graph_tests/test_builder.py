@@ -1,16 +1,30 @@
+import itertools
 import unittest
 import networkx as nx
-from src.parser.core import SASParser
-from src.graph.builder import StateSpaceBuilder
-from tests.config import get_data_file
+from src.graph.builder import StateSpaceBuilder, UNREACHABLE
+from src.parser.models import SASOperator, SASProblem, SASVariable
+from tests.config import get_data_file, load_problem
+
+
+def make_problem(sizes, operators, initial_state):
+    variables = [
+        SASVariable(f"var{i}", i, size, [f"v{i}={j}" for j in range(size)])
+        for i, size in enumerate(sizes)
+    ]
+    return SASProblem(3, False, variables, initial_state, (), operators)
+
+
+def edges_by_state(graph):
+    state = dict(graph.nodes(data="state"))
+    return {(state[u], state[v]) for u, v in graph.edges}
 
 
 class TestSimpleSwitchGraph(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.problem = load_problem(get_data_file("switch_simple.sas"))
+
     def setUp(self):
-        file_path = get_data_file("switch_simple.sas")
-        with open(file_path, "r") as f:
-            content = f.read()
-        self.problem = SASParser().parse(content)
         self.builder = StateSpaceBuilder(self.problem)
         self.graph = self.builder.build_reachable_graph()
 
@@ -21,8 +35,8 @@ class TestSimpleSwitchGraph(unittest.TestCase):
 
     def test_transition_correctness(self):
         """Check if the edge correctly connects 0 -> 1."""
-        off_state = (0,)
-        on_state = (1,)
+        off_state = self.builder.id_of[(0,)]
+        on_state = self.builder.id_of[(1,)]
 
         # Check edge existence
         self.assertTrue(self.graph.has_edge(off_state, on_state))
@@ -34,11 +48,11 @@ class TestSimpleSwitchGraph(unittest.TestCase):
 
 
 class TestGripperGraph(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.problem = load_problem(get_data_file("gripper_simple.sas"))
+
     def setUp(self):
-        file_path = get_data_file("gripper_simple.sas")
-        with open(file_path, "r") as f:
-            content = f.read()
-        self.problem = SASParser().parse(content)
         self.builder = StateSpaceBuilder(self.problem)
         self.graph = self.builder.build_reachable_graph()
 
@@ -66,12 +80,14 @@ class TestGripperGraph(unittest.TestCase):
         Start: (0, 0, 0) -> Robot A, Free, Ball A
         Goal:  (?, ?, ?) -> Ball at Room B (Index 2 is Value 1)
         """
-        start_node = tuple(self.problem.initial_state)
+        start_node = self.builder.id_of[tuple(self.problem.initial_state)]
 
         # Find WHICH node in the graph represents the goal
         # The goal is "Ball (Var 2) is at Room B (Value 1)"
         goal_nodes = [
-            n for n in self.graph.nodes if n[2] == 1  # Check if Variable 2 == 1
+            n
+            for n, state in self.graph.nodes(data="state")
+            if state[2] == 1  # Check if Variable 2 == 1
         ]
 
         self.assertTrue(len(goal_nodes) > 0, "Graph contains no goal states!")
@@ -92,6 +108,50 @@ class TestGripperGraph(unittest.TestCase):
 
         self.assertTrue(found_path, "Could not find path to goal!")
 
+    def test_streaming_search_matches_graph(self):
+        """The iterator must visit the same states with the same successors."""
+        streamed = dict(self.builder.build_reachable_graph_iter())
+
+        self.assertEqual(next(iter(streamed)), tuple(self.problem.initial_state))
+        self.assertEqual(set(streamed), set(self.builder.state_of))
+        for node, state in self.graph.nodes(data="state"):
+            expected = {self.builder.state_of[v] for v in self.graph.successors(node)}
+            self.assertEqual(set(streamed[state]), expected)
+            self.assertEqual(len(streamed[state]), len(expected))
+
+    def test_multi_source_bfs(self):
+        """Every row must match a plain single-source BFS from that state."""
+        sources = list(self.builder.state_of)
+        dist = self.builder.multi_source_bfs(self.graph, sources)
+
+        for i, state in enumerate(sources):
+            lengths = nx.single_source_shortest_path_length(
+                self.graph, self.builder.id_of[state]
+            )
+            for node in self.graph.nodes:
+                self.assertEqual(dist[i, node], lengths.get(node, UNREACHABLE))
+
+        # Unit costs in gripper, so the largest finite entry is the diameter
+        self.assertEqual(dist[dist != UNREACHABLE].max(), 5)
+
+    def test_multi_source_bfs_uses_given_graph(self):
+        """Distances are over the graph passed in, not the builder's last build."""
+        sources = list(self.builder.state_of)
+        expected = self.builder.multi_source_bfs(self.graph, sources)
+
+        self.builder.build_cartesian_graph()
+        dist = self.builder.multi_source_bfs(self.graph, sources)
+        self.assertEqual(dist.shape, (len(sources), 6))
+        self.assertTrue((dist == expected).all())
+
+    def test_batched_search_matches_packed_search(self):
+        """The NumPy frontier BFS must number states and edges like the packed BFS."""
+        self.assertEqual(self.builder._bfs_frontier(), self.builder._bfs_packed())
+
+    def test_compiled_search_matches_packed_search(self):
+        """The Numba BFS must number states and edges like the packed BFS."""
+        self.assertEqual(self.builder._bfs_compiled(), self.builder._bfs_packed())
+
 
 class TestGripperCartesianGraph(unittest.TestCase):
     """
@@ -99,11 +159,11 @@ class TestGripperCartesianGraph(unittest.TestCase):
     Verifies that we generate the full universe and can filter it back down.
     """
 
+    @classmethod
+    def setUpClass(cls):
+        cls.problem = load_problem(get_data_file("gripper_simple.sas"))
+
     def setUp(self):
-        file_path = get_data_file("gripper_simple.sas")
-        with open(file_path, "r") as f:
-            content = f.read()
-        self.problem = SASParser().parse(content)
         self.builder = StateSpaceBuilder(self.problem)
         # Build the raw 'God Mode' graph
         self.raw_graph = self.builder.build_cartesian_graph()
@@ -135,12 +195,95 @@ class TestGripperCartesianGraph(unittest.TestCase):
         self.assertEqual(len(filtered_graph.nodes), 6)
 
         # 2. Must contain start
-        self.assertTrue(filtered_graph.has_node((0, 0, 0)))
+        self.assertTrue(filtered_graph.has_node(self.builder.id_of[(0, 0, 0)]))
 
         # 3. Must NOT contain an impossible state
         # e.g., (0, 1, 0) -> Robot A, Hand Carry, Ball A
         # This implies hand is full but ball is still on ground. Impossible.
-        self.assertFalse(filtered_graph.has_node((0, 1, 0)))
+        self.assertFalse(filtered_graph.has_node(self.builder.id_of[(0, 1, 0)]))
+
+    def test_filter_component_of_other_graph(self):
+        """The start is found in any graph, not only the builder's last build."""
+        # A fresh builder that never built this graph
+        other = StateSpaceBuilder(self.problem).get_main_component(self.raw_graph)
+        self.assertEqual(len(other.nodes), 6)
+
+        # The same builder, after it has built a different graph
+        self.builder.build_reachable_graph()
+        filtered_graph = self.builder.get_main_component(self.raw_graph)
+        self.assertEqual(
+            {state for _, state in filtered_graph.nodes(data="state")},
+            {state for _, state in other.nodes(data="state")},
+        )
+
+
+class TestConditionalEffectsReachableGraph(unittest.TestCase):
+    """The packed BFS queue must reach exactly what tuple-level apply reaches."""
+
+    def setUp(self):
+        self.problem = make_problem(
+            [2, 2, 3],
+            [
+                # Unconditional effect after a conditional one on the same variable
+                SASOperator("override", 1, [], [(0, 1, [(1, 0)]), (0, 0, [])]),
+                SASOperator("grab", 1, [(1, 0)], [(1, 1, [])]),
+                SASOperator("move", 1, [], [(0, 1, [(1, 1)]), (2, 1, [(0, 1)])]),
+                SASOperator("drop", 1, [(2, 1)], [(2, 2, []), (1, 0, [(0, 1)])]),
+            ],
+            (0, 0, 0),
+        )
+
+    def test_edges_match_tuple_apply(self):
+        graph = StateSpaceBuilder(self.problem).build_reachable_graph()
+
+        expected = set()
+        seen = {self.problem.initial_state}
+        queue = [self.problem.initial_state]
+        for state in queue:
+            for op in self.problem.operators:
+                if op.is_applicable(state):
+                    succ = op.apply(state)
+                    expected.add((state, succ))
+                    if succ not in seen:
+                        seen.add(succ)
+                        queue.append(succ)
+
+        self.assertEqual(len(graph.nodes), len(seen))
+        self.assertEqual(edges_by_state(graph), expected)
+        self.assertIn(((0, 0, 0), (0, 0, 0)), expected)  # override is a no-op
+
+
+class TestConditionalEffectsCartesianGraph(unittest.TestCase):
+    """The Cartesian graph must apply effects exactly like SASOperator.apply."""
+
+    def setUp(self):
+        self.problem = make_problem(
+            [2, 2, 3],
+            [
+                # Unconditional effect after a conditional one on the same variable
+                SASOperator("override", 1, [], [(0, 1, [(1, 0)]), (0, 0, [])]),
+                # Conditional effect overriding an unconditional one
+                SASOperator("toggle", 1, [(2, 0)], [(1, 1, []), (1, 0, [(0, 1)])]),
+                SASOperator("step", 2, [], [(2, 2, [(0, 1), (1, 1)]), (0, 1, [])]),
+            ],
+            (0, 0, 0),
+        )
+
+    def test_edges_match_tuple_apply(self):
+        graph = StateSpaceBuilder(self.problem).build_cartesian_graph()
+        expected = {
+            (state, op.apply(state))
+            for state in itertools.product(range(2), range(2), range(3))
+            for op in self.problem.operators
+            if op.is_applicable(state)
+        }
+        self.assertEqual(edges_by_state(graph), expected)
+
+    def test_no_variables(self):
+        problem = make_problem([], [SASOperator("noop", 1, [], [])], ())
+        graph = StateSpaceBuilder(problem).build_cartesian_graph()
+        self.assertEqual(list(graph.nodes(data="state")), [(0, ())])
+        self.assertEqual(list(graph.edges), [(0, 0)])
 
 
 if __name__ == "__main__":
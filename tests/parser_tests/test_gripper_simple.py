@@ -1,17 +1,22 @@
+import itertools
+import os
+import tempfile
 import unittest
-from src.parser.core import SASParser
-from tests.config import get_data_file
+from pathlib import Path
+from src.parser.models import SASOperator, SASProblem
+from tests.config import get_data_file, load_problem
 
 
 class TestGripperDomain(unittest.TestCase):
-    def setUp(self):
-        file_path = get_data_file("gripper_simple.sas")
+    @classmethod
+    def setUpClass(cls):
+        # The parsed problem is read-only in these tests, so parse once per class
+        cls.problem = load_problem(get_data_file("gripper_simple.sas"))
+        cls.ops_by_name = {op.name: op for op in cls.problem.operators}
 
-        with open(file_path, "r") as f:
-            content = f.read()
-
-        self.parser = SASParser()
-        self.problem = self.parser.parse(content)
+    def get_operator(self, name):
+        self.assertIn(name, self.ops_by_name, "Operator missing from parsed problem")
+        return self.ops_by_name[name]
 
     def test_metadata(self):
         """Test version and metric settings."""
@@ -56,20 +61,21 @@ class TestGripperDomain(unittest.TestCase):
         Requires: Robot at A (0), Hand Free (0), Ball at A (0)
         Effects: Hand Carrying (1), Ball Carried (2)
         """
-        pick_op = next(op for op in self.problem.operators if "pick" in op.name)
+        pick_op = self.get_operator("pick ball1 rooma left")
 
         # 1. Check Explicit Prevail: Robot (Var 0) must be at Room A (Value 0)
-        self.assertIn((0, 0), pick_op.preconditions)
+        self.assertIn((0, 0), pick_op.preconditions_set)
 
         # 2. Check Implicit Preconds (from effect lines)
         # Hand (Var 1) must be Free (Value 0)
-        self.assertIn((1, 0), pick_op.preconditions)
+        self.assertIn((1, 0), pick_op.preconditions_set)
         # Ball (Var 2) must be at Room A (Value 0)
-        self.assertIn((2, 0), pick_op.preconditions)
+        self.assertIn((2, 0), pick_op.preconditions_set)
 
         # 3. Check Effects
-        self.assertIn((1, 1, []), pick_op.effects)  # Hand becomes Carrying (1)
-        self.assertIn((2, 2, []), pick_op.effects)  # Ball becomes Carried (2)
+        self.assertIn((1, 1), pick_op.effects_pairs_set)  # Hand becomes Carrying (1)
+        self.assertIn((2, 2), pick_op.effects_pairs_set)  # Ball becomes Carried (2)
+        self.assertFalse(pick_op.has_conditional_effects)
 
     def test_drop_operator(self):
         """
@@ -77,27 +83,113 @@ class TestGripperDomain(unittest.TestCase):
         Requires: Robot at B (1), Hand Carrying (1), Ball Carried (2)
         Effects: Hand Free (0), Ball at B (1)
         """
-        drop_op = next(op for op in self.problem.operators if "drop" in op.name)
+        drop_op = self.get_operator("drop ball1 roomb left")
 
         # 1. Check Explicit Prevail: Robot (Var 0) must be at Room B (Value 1)
-        self.assertIn((0, 1), drop_op.preconditions)
+        self.assertIn((0, 1), drop_op.preconditions_set)
 
         # 2. Check Implicit Preconds (from effect lines)
         # Hand (Var 1) must be Carrying (Value 1)
-        self.assertIn((1, 1), drop_op.preconditions)
+        self.assertIn((1, 1), drop_op.preconditions_set)
         # Ball (Var 2) must be Carried (Value 2)
-        self.assertIn((2, 2), drop_op.preconditions)
+        self.assertIn((2, 2), drop_op.preconditions_set)
 
         # 3. Check Effects
-        self.assertIn((1, 0, []), drop_op.effects)  # Hand becomes Free (0)
-        self.assertIn((2, 1, []), drop_op.effects)  # Ball becomes At Room B (1)
+        self.assertIn((1, 0), drop_op.effects_pairs_set)  # Hand becomes Free (0)
+        self.assertIn((2, 1), drop_op.effects_pairs_set)  # Ball becomes At Room B (1)
+        self.assertFalse(drop_op.has_conditional_effects)
 
     def test_move_operator(self):
         """Test 'move rooma roomb'."""
-        move_op = next(op for op in self.problem.operators if "move" in op.name)
+        move_op = self.get_operator("move rooma roomb")
         # Robot moves from 0 (Room A) to 1 (Room B)
-        self.assertIn((0, 0), move_op.preconditions)
-        self.assertIn((0, 1, []), move_op.effects)
+        self.assertIn((0, 0), move_op.preconditions_set)
+        self.assertIn((0, 1), move_op.effects_pairs_set)
+        self.assertFalse(move_op.has_conditional_effects)
+
+    def test_packed_state_roundtrip(self):
+        """Packed operators must agree with the tuple versions on every state."""
+        self.problem.compile_operators()
+        for state in itertools.product(range(2), range(2), range(3)):
+            packed = self.problem.pack(state)
+            self.assertEqual(self.problem.unpack(packed), state)
+
+            for op in self.problem.operators:
+                applicable = op.is_applicable(state)
+                self.assertEqual(op.is_applicable_packed(packed), applicable)
+                if applicable:
+                    self.assertEqual(
+                        self.problem.unpack(op.apply_packed(packed)), op.apply(state)
+                    )
+
+    def test_packed_contradictory_conditions(self):
+        """Contradictory requirements must never match, as with tuple states."""
+        operators = [
+            # Robot required in both rooms (prevail plus effect precondition)
+            SASOperator("bad_pre", 1, [(0, 0), (0, 1)], [(1, 1, [])]),
+            # Conditional effect whose conditions can never all hold
+            SASOperator("bad_cond", 1, [], [(1, 1, []), (2, 1, [(0, 0), (0, 1)])]),
+        ]
+        problem = SASProblem(3, True, self.problem.variables, (0, 0, 0), (), operators)
+        problem.compile_operators()
+
+        for state in itertools.product(range(2), range(2), range(3)):
+            packed = problem.pack(state)
+            for op in operators:
+                applicable = op.is_applicable(state)
+                self.assertEqual(op.is_applicable_packed(packed), applicable)
+                if applicable:
+                    self.assertEqual(
+                        problem.unpack(op.apply_packed(packed)), op.apply(state)
+                    )
+        pre_mask, pre_value, _, _ = problem.operator_masks()
+        self.assertEqual((pre_mask[0], pre_value[0]), (0, 1))
+
+    def test_packed_effect_order(self):
+        """Effects on one variable apply in file order on packed states too."""
+        operators = [
+            # Conditional then unconditional: the unconditional one always wins
+            SASOperator("cond_first", 1, [], [(0, 1, [(1, 0)]), (0, 0, [])]),
+            # Unconditional then conditional: the conditional one wins if it fires
+            SASOperator("cond_last", 1, [], [(0, 0, []), (0, 1, [(1, 0)])]),
+        ]
+        problem = SASProblem(3, True, self.problem.variables, (0, 0, 0), (), operators)
+        problem.compile_operators()
+
+        for state in itertools.product(range(2), range(2), range(3)):
+            packed = problem.pack(state)
+            for op in operators:
+                self.assertEqual(
+                    problem.unpack(op.apply_packed(packed)), op.apply(state)
+                )
+
+    def test_uncompiled_operator_refuses_packed(self):
+        """An operator not attached to a problem has no masks to test against."""
+        op = SASOperator("pick", 1, [(0, 1)], [(1, 1, [])])
+        with self.assertRaises(AssertionError):
+            op.is_applicable_packed(0)
+        with self.assertRaises(AssertionError):
+            op.apply_packed(0)
+
+    def test_npz_roundtrip(self):
+        """save_npz/load_npz must reproduce the parsed problem exactly."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "gripper_simple.npz"
+            self.problem.save_npz(path)
+            loaded = SASProblem.load_npz(path)
+
+        self.assertEqual(loaded, self.problem)
+        self.assertEqual(loaded.packed_bits, self.problem.packed_bits)
+        # Equal problems (and operators) must also hash equally
+        self.assertEqual(hash(loaded), hash(self.problem))
+        self.assertEqual(set(loaded.operators), set(self.problem.operators))
+
+        # A path without the .npz suffix is written and read back as given
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(Path(tmp) / "gripper_simple")
+            self.problem.save_npz(path)
+            self.assertEqual(os.listdir(tmp), ["gripper_simple"])
+            self.assertEqual(SASProblem.load_npz(path), self.problem)
 
 
 if __name__ == "__main__":
@@ -1,17 +1,12 @@
 import unittest
-from src.parser.core import SASParser
-from tests.config import get_data_file
+from tests.config import PARSER, get_data_bytes, get_data_file, load_problem
 
 
 class TestSimpleSwitch(unittest.TestCase):
-    def setUp(self):
-        file_path = get_data_file("switch_simple.sas")
-
-        with open(file_path, "r") as f:
-            content = f.read()
-
-        self.parser = SASParser()
-        self.problem = self.parser.parse(content)
+    @classmethod
+    def setUpClass(cls):
+        # The parsed problem is read-only in these tests, so parse once per class
+        cls.problem = load_problem(get_data_file("switch_simple.sas"))
 
     def test_metadata(self):
         """Test version and metric settings."""
@@ -45,17 +40,25 @@ class TestSimpleSwitch(unittest.TestCase):
 
         # Check Precondition (Implicit from '0 0 0 1')
         # Var 0 must be 0 (Off) to turn it on
-        self.assertIn((0, 0), op.preconditions)
+        self.assertIn((0, 0), op.preconditions_set)
 
         # Check Effect
         # Var 0 becomes 1 (On)
-        self.assertIn((0, 1, []), op.effects)
+        self.assertIn((0, 1), op.effects_pairs_set)
+        self.assertFalse(op.has_conditional_effects)
 
     def test_goal(self):
         """Test if the goal is parsed correctly."""
         # File says: Var 0 must be 1 (On)
         self.assertEqual(self.problem.goal, ((0, 1),))
 
+    def test_parse_from_buffer(self):
+        """Parsing a memory-mapped file gives the same problem as a str."""
+        with get_data_bytes("switch_simple.sas") as content:
+            problem = PARSER.parse(content)
+        with open(get_data_file("switch_simple.sas"), "r") as f:
+            self.assertEqual(problem, PARSER.parse(f.read()))
+
 
 if __name__ == "__main__":
     unittest.main()